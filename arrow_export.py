@@ -0,0 +1,294 @@
+"""
+將飛行日誌 (JSON Lines) 以欄式 (columnar) 格式匯出為 Parquet 或 Arrow IPC 檔案。
+
+每個遙測參數成為一個具型別的 Arrow 欄位，單位字串以字典編碼 (dictionary-encoded) 儲存，
+數據按時間順序分批寫入 (每批即為一個 row group / record batch)，記憶體用量只與批次大小有關。
+
+用法：
+  python arrow_export.py flight_data_log.jsonl flight_data.parquet
+  python arrow_export.py flight_data_log.jsonl flight_data.arrow --batch-rows 100000
+
+以 Arrow IPC 格式匯出後，可用 load_flight_table() 透過記憶體映射 (memory map) 零拷貝讀取整趟飛行。
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow 為可選依賴，只有匯出功能需要
+    pa = None
+    pq = None
+
+from config_loader import TelemetryConfig
+
+ARROW_IPC_EXTENSIONS = (".arrow", ".feather", ".ipc")
+DEFAULT_BATCH_ROWS = 65536
+
+# struct 格式字元對應的 Arrow 整數型別 (僅用於保留原始整數值的欄位)
+_STRUCT_FORMAT_TYPES = {
+    "b": "int8", "B": "uint8",
+    "h": "int16", "H": "uint16",
+    "i": "int32", "I": "uint32",
+    "l": "int32", "L": "uint32",
+    "q": "int64", "Q": "uint64",
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Arrow/Parquet 匯出需要 pyarrow 套件，請先執行 pip install pyarrow")
+
+
+def infer_file_format(filepath):
+    """依副檔名判斷輸出格式："arrow" (IPC) 或 "parquet" """
+    return "arrow" if filepath.lower().endswith(ARROW_IPC_EXTENSIONS) else "parquet"
+
+
+def _keeps_integer_value(param_def):
+    # 同步字、校驗和與序號計數器不套用縮放因子 (與 TelemetryFrameDecoder 一致)；
+    # 未定義 scale_factor 的參數 (例如狀態位元欄位) 數值不變，也保留整數型別
+    if "scale_factor" not in param_def:
+        return True
+    return param_def.get("is_sync") or param_def.get("is_checksum") or param_def.get("is_sequence_counter")
+
+
+class ArrowFlightLogWriter:
+    """
+    將解碼後的數據幀 (與 FileLogHandler 寫入的 JSON 物件格式相同) 累積成欄位緩衝區，
+    每滿 batch_rows 列就寫出一個 record batch。
+    """
+
+    def __init__(self, config, filepath, file_format=None, batch_rows=DEFAULT_BATCH_ROWS,
+                 include_raw_frames=False, compression=None):
+        _require_pyarrow()
+        self.config = config
+        self.filepath = filepath
+        self.file_format = file_format or infer_file_format(filepath)
+        self.batch_rows = batch_rows
+        self.include_raw_frames = include_raw_frames
+        # Parquet 預設壓縮；Arrow IPC 預設不壓縮，以保留記憶體映射時的零拷貝讀取
+        if compression is None:
+            compression = "zstd" if self.file_format == "parquet" else None
+        self.compression = compression
+
+        self._value_columns = [] # (欄位名稱, Arrow 型別, 是否為整數)
+        self._unit_columns = [] # (欄位名稱, 參數名稱)
+        fields = [pa.field("processing_timestamp_utc", pa.timestamp("us", tz="UTC"))]
+        if include_raw_frames:
+            fields.append(pa.field("raw_frame", pa.binary()))
+        for param_def in config.get_all_parameter_definitions():
+            name = param_def["name"]
+            if _keeps_integer_value(param_def) and param_def["struct_format"] in _STRUCT_FORMAT_TYPES:
+                arrow_type = getattr(pa, _STRUCT_FORMAT_TYPES[param_def["struct_format"]])()
+                self._value_columns.append((name, arrow_type, True))
+            else:
+                arrow_type = pa.float64()
+                self._value_columns.append((name, arrow_type, False))
+            fields.append(pa.field(name, arrow_type))
+            if param_def.get("unit"):
+                unit_column = name + "_unit"
+                self._unit_columns.append((unit_column, name))
+                fields.append(pa.field(unit_column, pa.dictionary(pa.int32(), pa.string())))
+        self.schema = pa.schema(fields)
+
+        # 每個單位欄位的字典只會增長，使各批次的字典保持一致 (IPC 以 delta 方式寫出新增項目)
+        self._unit_dictionaries = {
+            unit_column: [config.get_parameter_definition(name)["unit"]]
+            for unit_column, name in self._unit_columns
+        }
+        self._writer = None
+        self._sink = None
+        self._closed = False
+        self.rows_written = 0
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self._buffers = {field.name: [] for field in self.schema}
+
+    def __len__(self):
+        """目前緩衝區中尚未寫出的列數"""
+        return len(self._buffers["processing_timestamp_utc"])
+
+    def open(self):
+        if self.file_format == "parquet":
+            self._writer = pq.ParquetWriter(
+                self.filepath, self.schema,
+                compression=self.compression,
+                use_dictionary=[unit_column for unit_column, _ in self._unit_columns],
+            )
+        elif self.file_format == "arrow":
+            options = pa.ipc.IpcWriteOptions(compression=self.compression, emit_dictionary_deltas=True)
+            self._sink = pa.OSFile(self.filepath, "wb")
+            self._writer = pa.ipc.new_file(self._sink, self.schema, options=options)
+        else:
+            raise ValueError(f"不支援的輸出格式: {self.file_format}")
+
+    def append(self, record):
+        """加入一筆數據幀；緩衝區滿時自動寫出"""
+        if self._closed:
+            raise ValueError(f"寫入器已關閉，無法再寫入 {self.filepath}")
+        buffers = self._buffers
+        payload = record.get("decoded_payload", {})
+
+        timestamp = record.get("processing_timestamp_utc")
+        try:
+            timestamp = datetime.datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            timestamp = None
+        buffers["processing_timestamp_utc"].append(timestamp)
+
+        if self.include_raw_frames:
+            raw_frame_hex = record.get("raw_frame_hex")
+            try:
+                buffers["raw_frame"].append(bytes.fromhex(raw_frame_hex))
+            except (TypeError, ValueError):
+                buffers["raw_frame"].append(None)
+
+        for name, _, is_integer in self._value_columns:
+            value = payload.get(name)
+            # 解碼失敗時 payload 中為錯誤字串 (例如 "解碼錯誤")，存為 null
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = int(value) if is_integer else float(value)
+            else:
+                value = None
+            buffers[name].append(value)
+
+        for unit_column, name in self._unit_columns:
+            buffers[unit_column].append(payload.get(unit_column))
+
+        if len(self) >= self.batch_rows:
+            self.flush()
+
+    def _build_unit_array(self, unit_column):
+        dictionary = self._unit_dictionaries[unit_column]
+        indices = []
+        for unit in self._buffers[unit_column]:
+            if unit is None:
+                indices.append(None)
+                continue
+            try:
+                indices.append(dictionary.index(unit))
+            except ValueError:
+                dictionary.append(unit)
+                indices.append(len(dictionary) - 1)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(dictionary, type=pa.string())
+        )
+
+    def flush(self):
+        """將緩衝區寫出為一個 record batch (Parquet 中即為一個 row group)"""
+        row_count = len(self)
+        if not row_count:
+            return
+        if self._writer is None:
+            self.open()
+        unit_columns = self._unit_dictionaries
+        arrays = [
+            self._build_unit_array(field.name) if field.name in unit_columns
+            else pa.array(self._buffers[field.name], type=field.type)
+            for field in self.schema
+        ]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if self.file_format == "parquet":
+            self._writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_count)
+        else:
+            self._writer.write_batch(batch)
+        self.rows_written += row_count
+        self._reset_buffers()
+
+    def close(self):
+        """寫出剩餘數據與檔案 footer；重複呼叫不會覆寫已完成的檔案"""
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        if self._writer is None:
+            self.open() # 即使沒有數據也寫出只含 schema 的有效檔案
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        self._writer = None
+        self._sink = None
+
+
+def convert_jsonl_log(config, input_path, output_path, file_format=None, batch_rows=DEFAULT_BATCH_ROWS,
+                      include_raw_frames=False, compression=None):
+    """
+    以串流方式將 JSON Lines 飛行日誌轉換為 Parquet / Arrow IPC，記憶體用量以 batch_rows 為上限。
+    返回 (寫出的列數, 跳過的無效行數)。
+    """
+    skipped_lines = 0
+    with open(input_path, "r", encoding="utf-8") as f:
+        writer = ArrowFlightLogWriter(
+            config, output_path, file_format=file_format, batch_rows=batch_rows,
+            include_raw_frames=include_raw_frames, compression=compression,
+        )
+        try:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"[ArrowExport] 警告: 第 {line_number} 行不是有效的 JSON，已跳過: {e}")
+                    skipped_lines += 1
+                    continue
+                if not isinstance(record, dict):
+                    print(f"[ArrowExport] 警告: 第 {line_number} 行不是 JSON 物件，已跳過: {line[:80]}")
+                    skipped_lines += 1
+                    continue
+                writer.append(record)
+        finally:
+            writer.close()
+    return writer.rows_written, skipped_lines
+
+
+def load_flight_table(filepath):
+    """
+    載入匯出的飛行數據為 pyarrow.Table。
+    Arrow IPC 檔案 (未壓縮) 透過記憶體映射零拷貝讀取；Parquet 檔案以記憶體映射方式讀取後解碼。
+    分析時可再呼叫 table.to_pandas()。
+    """
+    _require_pyarrow()
+    if infer_file_format(filepath) == "arrow":
+        source = pa.memory_map(filepath, "r")
+        return pa.ipc.open_file(source).read_all()
+    return pq.read_table(filepath, memory_map=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="將 JSON Lines 飛行日誌匯出為 Parquet / Arrow IPC")
+    parser.add_argument("input", help="輸入的 JSON Lines 日誌 (例如 flight_data_log.jsonl)")
+    parser.add_argument("output", help="輸出檔案 (.parquet，或 .arrow/.feather/.ipc 為 Arrow IPC)")
+    parser.add_argument("--config", default="telemetry parameters.json", help="遙測參數設定檔路徑")
+    parser.add_argument("--format", choices=("parquet", "arrow"), help="輸出格式 (預設依副檔名判斷)")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS, help="每個 row group / record batch 的列數")
+    parser.add_argument("--compression", help="壓縮演算法 (Parquet 預設 zstd；Arrow IPC 預設不壓縮)")
+    parser.add_argument("--include-raw-frames", action="store_true", help="同時保存原始幀 (binary 欄位)")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("錯誤: 找不到 pyarrow 套件，請先執行 pip install pyarrow")
+        sys.exit(1)
+
+    try:
+        config = TelemetryConfig(config_path=args.config)
+    except Exception as e:
+        print(f"載入設定檔失敗: {e}")
+        sys.exit(1)
+
+    rows, skipped = convert_jsonl_log(
+        config, args.input, args.output, file_format=args.format, batch_rows=args.batch_rows,
+        include_raw_frames=args.include_raw_frames, compression=args.compression,
+    )
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"[ArrowExport] 已寫出 {rows} 列至 {args.output} ({size_mb:.2f} MB)，跳過 {skipped} 行無效數據。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+遙測管線端到端吞吐量與延遲基準測試。
+
+情境 (scenario)：
+  source    - SimulatedDataSource.get_next_frame 的產生速率
+  decoder   - TelemetryFrameDecoder.decode 的每秒解碼幀數
+  handlers  - 各 Handler (Console / File / WebSocket 入佇列) 的持續處理速率
+  pipeline  - 完整數據迴圈 + WebSocket 扇出至 N 個本地 loopback 用戶端，
+              量測從幀產生到用戶端接收的 p50/p99/p99.9 延遲
+
+每個情境 (以及每個 Handler、每種用戶端數量) 都在獨立的子程序中執行，
+pipeline 情境的用戶端另在一個程序中運行，因此每幀 CPU 時間與峰值 RSS 只反映受測的管線本身。
+結果寫入 JSON 檔案，可搭配 --baseline 與前一次的結果比較以偵測效能退化。
+
+pipeline 情境需要 websockets 套件 (已在 websockets 17 上驗證；10 以上的舊版 API 亦支援)。
+
+用法 (於專案根目錄)：
+  python benchmarks/run_benchmarks.py --output bench_results.json
+  python benchmarks/run_benchmarks.py --scenarios pipeline --clients 1,10 --baseline bench_results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource # 僅 POSIX 提供，用於量測峰值 RSS
+except ImportError:
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from config_loader import TelemetryConfig
+from data_source import SimulatedDataSource
+from frame_decoder import TelemetryFrameDecoder
+from sequence_tracker import SequenceTracker
+
+DEFAULT_CONFIG_PATH = os.path.join(ROOT_DIR, "telemetry parameters.json")
+SCENARIOS = ("source", "decoder", "handlers", "pipeline")
+HANDLER_NAMES = ("ConsoleLogHandler", "FileLogHandler", "WebSocketDataHandler")
+CONNECT_TIMEOUT_S = 30.0 # 用戶端全部完成連線的期限
+DRAIN_TIMEOUT_S = 10.0 # 數據迴圈結束後，等待用戶端收完訊息的期限
+
+
+def _peak_rss_kb():
+    """返回目前程序的峰值 RSS (KB)；平台不支援時返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin": # macOS 以 bytes 回報
+        peak //= 1024
+    return peak
+
+
+def _percentile(sorted_values, pct):
+    """最近秩 (nearest-rank) 百分位數，輸入需已排序"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _make_result(scenario, name, frames, wall_s, cpu_s, **extra):
+    result = {
+        "scenario": scenario,
+        "name": name,
+        "frames": frames,
+        "elapsed_s": wall_s,
+        "frames_per_s": frames / wall_s if wall_s > 0 else None,
+        "cpu_s_per_frame": cpu_s / frames if frames else None,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+    result.update(extra)
+    return result
+
+
+def _timed(fn, frames):
+    """執行 fn(frames)，返回 (牆鐘時間, CPU 時間)"""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    fn(frames)
+    return time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def _build_frame_package(raw_frame, decoded_data):
+    """與主程式相同格式的 Handler 輸入"""
+    return {
+        "processing_timestamp_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "source_timestamp_s": decoded_data.get("timestamp_s", "N/A"),
+        "rocket_id": decoded_data.get("rocket_id", "N/A"),
+        "raw_frame_hex": raw_frame.hex().upper(),
+        "decoded_payload": decoded_data,
+    }
+
+
+def bench_source(config, frames):
+    data_source = SimulatedDataSource(config)
+
+    def run(n):
+        for _ in range(n):
+            data_source.get_next_frame()
+
+    wall_s, cpu_s = _timed(run, frames)
+    return [_make_result("source", "SimulatedDataSource.get_next_frame", frames, wall_s, cpu_s)]
+
+
+def bench_decoder(config, frames):
+    data_source = SimulatedDataSource(config)
+    decoder = TelemetryFrameDecoder(config)
+    raw_frames = [data_source.get_next_frame() for _ in range(frames)]
+
+    def run(n):
+        for raw_frame in raw_frames[:n]:
+            decoder.decode(raw_frame)
+
+    wall_s, cpu_s = _timed(run, frames)
+    return [_make_result("decoder", "TelemetryFrameDecoder.decode", frames, wall_s, cpu_s)]
+
+
+def bench_handlers(config, frames, handler_name):
+    from data_handlers import ConsoleLogHandler, FileLogHandler, WebSocketDataHandler
+
+    data_source = SimulatedDataSource(config)
+    decoder = TelemetryFrameDecoder(config)
+    packages = []
+    for _ in range(frames):
+        raw_frame = data_source.get_next_frame()
+        packages.append(_build_frame_package(raw_frame, decoder.decode(raw_frame)))
+
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, "w", encoding="utf-8") as devnull:
+        handler = {
+            "ConsoleLogHandler": ConsoleLogHandler,
+            "FileLogHandler": lambda: FileLogHandler(filepath=os.path.join(tmp_dir, "bench_log.jsonl")),
+            "WebSocketDataHandler": WebSocketDataHandler,
+        }[handler_name]()
+        with contextlib.redirect_stdout(devnull):
+            handler.setup()
+
+        if isinstance(handler, WebSocketDataHandler):
+            # 未啟動伺服器：量測序列化與入佇列成本，並即時取出以免佇列滿而丟棄
+            queue = handler._broadcast_queue
+
+            def run(n):
+                for package in packages[:n]:
+                    handler.handle_data(package)
+                    queue.get_nowait()
+        else:
+            def run(n):
+                for package in packages[:n]:
+                    handler.handle_data(package)
+
+        with contextlib.redirect_stdout(devnull):
+            wall_s, cpu_s = _timed(run, frames)
+            handler.cleanup()
+    return [_make_result("handlers", f"{handler_name}.handle_data", frames, wall_s, cpu_s)]
+
+
+class _TimestampingDataSource(SimulatedDataSource):
+    """記錄每個幀序號的產生時間 (time.time，可跨程序比較)，供用戶端計算端到端延遲。
+    幀數不超過序號計數器範圍，因此序號不會重複，字典大小也以幀數為上限。"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.generated_at = {}
+
+    def _next_sequence(self):
+        sequence = super()._next_sequence()
+        self.generated_at[sequence] = time.time()
+        return sequence
+
+
+def _task_error(task):
+    if task.cancelled():
+        return "已取消"
+    error = task.exception()
+    return repr(error) if error else "連線被伺服器關閉"
+
+
+async def _run_client(uri, counter_name, receipts, stats, connected):
+    import websockets
+
+    async with websockets.connect(uri, max_queue=None, open_timeout=CONNECT_TIMEOUT_S) as websocket:
+        connected.set()
+        async for message in websocket:
+            received_at = time.time()
+            sequence = json.loads(message)["decoded_payload"].get(counter_name)
+            if sequence in receipts:
+                # 同一訊息被廣播多次，只計算第一次到達
+                stats["duplicate_messages"] += 1
+                continue
+            receipts[sequence] = received_at
+
+
+async def _client_process_async(uri, client_count, counter_name, conn):
+    receipts = [{} for _ in range(client_count)]
+    stats = {"duplicate_messages": 0}
+    connected = [asyncio.Event() for _ in range(client_count)]
+    tasks = [
+        asyncio.create_task(_run_client(uri, counter_name, receipts[i], stats, connected[i]))
+        for i in range(client_count)
+    ]
+
+    def failed_task():
+        return next((task for task in tasks if task.done()), None)
+
+    try:
+        deadline = time.monotonic() + CONNECT_TIMEOUT_S
+        while not all(event.is_set() for event in connected):
+            failed = failed_task()
+            if failed is not None:
+                raise RuntimeError(f"用戶端在連線階段即結束: {_task_error(failed)}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{client_count} 個用戶端未能在 {CONNECT_TIMEOUT_S} 秒內完成連線")
+            await asyncio.sleep(0.01)
+        conn.send(("ready", None))
+
+        # 等待伺服器的 done 訊息；期間任何用戶端連線結束都視為失敗
+        while not conn.poll():
+            failed = failed_task()
+            if failed is not None:
+                raise RuntimeError(f"用戶端連線在測試期間結束: {_task_error(failed)}")
+            await asyncio.sleep(0.005)
+        _, generated_at, expected_per_client = conn.recv()
+
+        expected_messages = expected_per_client * client_count
+        deadline = time.monotonic() + DRAIN_TIMEOUT_S
+        while sum(len(r) for r in receipts) < expected_messages and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = sorted(
+        received_at - generated_at[sequence]
+        for client_receipts in receipts
+        for sequence, received_at in client_receipts.items()
+        if sequence in generated_at
+    )
+    conn.send(("result", {
+        "received_messages": sum(len(r) for r in receipts),
+        "duplicate_messages": stats["duplicate_messages"],
+        "last_receipt_at": max((max(r.values()) for r in receipts if r), default=None),
+        "latency_p50_s": _percentile(latencies, 50),
+        "latency_p99_s": _percentile(latencies, 99),
+        "latency_p999_s": _percentile(latencies, 99.9),
+        "latency_max_s": latencies[-1] if latencies else None,
+    }))
+
+
+def _client_process_main(uri, client_count, counter_name, conn):
+    """在獨立程序中運行所有 loopback 用戶端，避免其 CPU 與記憶體計入受測管線"""
+    try:
+        asyncio.run(_client_process_async(uri, client_count, counter_name, conn))
+    except Exception as e:
+        conn.send(("error", f"用戶端程序發生錯誤: {e}"))
+
+
+async def _recv_message(conn, process, timeout_s):
+    """不阻塞事件循環地等待用戶端程序的訊息"""
+    deadline = time.monotonic() + timeout_s
+    while not conn.poll():
+        if not process.is_alive():
+            raise RuntimeError(f"用戶端程序意外結束 (exit code {process.exitcode})")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"等待用戶端程序回應超過 {timeout_s} 秒")
+        await asyncio.sleep(0.005)
+    return conn.recv()
+
+
+async def _bench_pipeline_async(config, frames, client_count, port):
+    import multiprocessing
+    import main_async_with_websocket
+    from data_handlers import WebSocketDataHandler
+
+    data_source = _TimestampingDataSource(config)
+    decoder = TelemetryFrameDecoder(config)
+    counter_name = config.sequence_counter["name"]
+    loop = asyncio.get_running_loop()
+
+    handler = WebSocketDataHandler(host="localhost", port=port)
+    await handler.start_server_async()
+
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    client_process = context.Process(
+        target=_client_process_main,
+        args=(f"ws://localhost:{port}", client_count, counter_name, child_conn),
+        daemon=True,
+    )
+    client_process.start()
+    try:
+        # 包含 spawn 啟動新直譯器的時間
+        kind, payload = await _recv_message(parent_conn, client_process, CONNECT_TIMEOUT_S + 30.0)
+        if kind != "ready":
+            raise RuntimeError(payload)
+        deadline = time.monotonic() + CONNECT_TIMEOUT_S
+        while len(handler.connected_clients) < client_count:
+            if parent_conn.poll():
+                raise RuntimeError(parent_conn.recv()[1])
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"伺服器只接受了 {len(handler.connected_clients)}/{client_count} 個連線")
+            await asyncio.sleep(0.01)
+
+        wall_start, cpu_start = time.time(), time.process_time()
+        # 與實際執行相同，每幀都經過序號追蹤並附上 link_quality 欄位
+        await main_async_with_websocket.data_processing_simulation_loop(
+            config, data_source, decoder, [handler], frames, loop, SequenceTracker(config), frame_interval_s=0
+        )
+        # 等待廣播佇列清空後，通知用戶端程序預期的訊息數與各幀產生時間
+        while not handler._broadcast_queue.empty():
+            await asyncio.sleep(0.001)
+        expected_per_client = frames - handler.dropped_message_count
+        parent_conn.send(("done", data_source.generated_at, expected_per_client))
+        kind, client_result = await _recv_message(parent_conn, client_process, DRAIN_TIMEOUT_S + 30.0)
+        cpu_s = time.process_time() - cpu_start
+        if kind != "result":
+            raise RuntimeError(client_result)
+    finally:
+        await handler.cleanup_async()
+        client_process.join(timeout=5.0)
+        if client_process.is_alive():
+            client_process.terminate()
+
+    last_receipt_at = client_result.pop("last_receipt_at")
+    wall_s = (last_receipt_at or time.time()) - wall_start
+    result = _make_result(
+        "pipeline",
+        f"data_loop+websocket_fanout[{client_count}]",
+        frames,
+        wall_s,
+        cpu_s,
+        clients=client_count,
+        pipeline_dropped_frames=handler.dropped_message_count,
+        expected_messages=expected_per_client * client_count,
+        **client_result,
+    )
+    if result["duplicate_messages"]:
+        # 每則訊息應只送達每個用戶端一次；重複訊息會使吞吐量與延遲數據失真
+        result["note"] = "用戶端收到重複訊息 (同一序號多於一次)，延遲僅以每個序號首次接收時間計算"
+    return result
+
+
+def bench_pipeline(config, frames, client_count, port):
+    if config.sequence_counter is None:
+        raise ValueError("pipeline 情境需要設定檔定義序號計數器 (is_sequence_counter)")
+    if frames > 1 << (8 * config.sequence_counter["length"]):
+        raise ValueError("pipeline 情境的幀數不可超過序號計數器範圍")
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        return [asyncio.run(_bench_pipeline_async(config, frames, client_count, port))]
+
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """與先前的結果比較，返回效能退化的項目列表"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["name"])
+        if not previous:
+            continue
+        if previous.get("frames_per_s") and result.get("frames_per_s") is not None:
+            if result["frames_per_s"] < previous["frames_per_s"] * (1.0 - tolerance):
+                regressions.append((result["name"], "frames_per_s", previous["frames_per_s"], result["frames_per_s"]))
+        for key in ("latency_p99_s", "cpu_s_per_frame"):
+            if previous.get(key) and result.get(key) is not None:
+                if result[key] > previous[key] * (1.0 + tolerance):
+                    regressions.append((result["name"], key, previous[key], result[key]))
+    return regressions
+
+
+def run_worker(args):
+    """子程序入口：執行單一情境 (或單一變體) 並將結果寫入 args.output"""
+    config = TelemetryConfig(config_path=args.config)
+    if args.worker == "source":
+        results = bench_source(config, args.frames)
+    elif args.worker == "decoder":
+        results = bench_decoder(config, args.frames)
+    elif args.worker == "handlers":
+        results = bench_handlers(config, args.frames, args.variant)
+    else:
+        results = bench_pipeline(config, args.pipeline_frames, int(args.variant), args.port)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f)
+
+
+def run_job(args, scenario, variant):
+    """在全新的子程序中執行一個情境，使峰值 RSS 與 CPU 時間不受其他情境影響"""
+    label = f"{scenario}[{variant}]" if variant is not None else scenario
+    print(f"[Benchmark] 執行 {label}...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "result.json")
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            "--worker", scenario,
+            "--config", args.config,
+            "--frames", str(args.frames),
+            "--pipeline-frames", str(args.pipeline_frames),
+            "--port", str(args.port),
+            "--output", output,
+        ]
+        if variant is not None:
+            command += ["--variant", str(variant)]
+        try:
+            completed = subprocess.run(command, timeout=args.job_timeout)
+        except subprocess.TimeoutExpired:
+            return [{"scenario": scenario, "name": label, "error": f"執行超過 {args.job_timeout} 秒"}]
+        if completed.returncode != 0 or not os.path.exists(output):
+            return [{"scenario": scenario, "name": label, "error": f"工作程序結束碼 {completed.returncode}"}]
+        with open(output, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="遙測管線吞吐量與延遲基準測試")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="遙測參數設定檔路徑")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"要執行的情境，以逗號分隔 ({','.join(SCENARIOS)})")
+    parser.add_argument("--frames", type=int, default=20000, help="source/decoder/handlers 情境的幀數")
+    parser.add_argument("--pipeline-frames", type=int, default=1000, help="pipeline 情境的幀數")
+    parser.add_argument("--clients", default="1,10,100,1000", help="pipeline 情境的用戶端數量，以逗號分隔")
+    parser.add_argument("--port", type=int, default=8766, help="pipeline 情境使用的 WebSocket 埠號")
+    parser.add_argument("--output", default="bench_results.json", help="JSON 結果輸出路徑")
+    parser.add_argument("--baseline", help="用於比較的先前 JSON 結果")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="判定退化的相對容許值 (預設 0.10)")
+    parser.add_argument("--job-timeout", type=float, default=1800.0, help="單一情境子程序的執行期限 (秒)")
+    # 內部使用：以子程序執行單一情境
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知的情境: {', '.join(sorted(unknown))}")
+    client_counts = [int(c) for c in args.clients.split(",") if c.strip()]
+    if "pipeline" in scenarios:
+        # 延遲以幀序號對應產生時間；序號回捲後會重複，因此幀數不可超過計數器範圍
+        counter_def = TelemetryConfig(config_path=args.config).sequence_counter
+        if counter_def is None:
+            parser.error("pipeline 情境需要設定檔定義序號計數器 (is_sequence_counter)")
+        modulus = 1 << (8 * counter_def["length"])
+        if args.pipeline_frames > modulus:
+            parser.error(f"--pipeline-frames 不可超過序號計數器範圍 ({modulus})")
+
+    jobs = []
+    for scenario in scenarios:
+        if scenario == "handlers":
+            jobs += [(scenario, name) for name in HANDLER_NAMES]
+        elif scenario == "pipeline":
+            jobs += [(scenario, count) for count in client_counts]
+        else:
+            jobs.append((scenario, None))
+
+    results = []
+    for scenario, variant in jobs:
+        results += run_job(args, scenario, variant)
+
+    report = {
+        "metadata": {
+            "timestamp_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config_path": args.config,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = [result for result in results if "error" in result]
+    for result in results:
+        if "error" in result:
+            print(f"  {result['name']:<45} 失敗: {result['error']}")
+            continue
+        line = f"  {result['name']:<45} {result['frames_per_s'] or 0:>12.1f} frames/s"
+        if result.get("duplicate_messages"):
+            line += f"  警告: 用戶端收到 {result['duplicate_messages']} 則重複訊息"
+        if result.get("latency_p50_s") is not None:
+            line += (f"  p50={result['latency_p50_s'] * 1000:.2f}ms"
+                     f" p99={result['latency_p99_s'] * 1000:.2f}ms"
+                     f" p99.9={result['latency_p999_s'] * 1000:.2f}ms")
+        print(line)
+    print(f"[Benchmark] 結果已寫入 {args.output}")
+
+    regressions = []
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        for name, metric, previous, current in regressions:
+            print(f"[Benchmark] 效能退化: {name} {metric}: {previous:.6g} -> {current:.6g}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
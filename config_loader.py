@@ -13,6 +13,9 @@ class TelemetryConfig:
         # 建立一個查找表，方便按名稱查找參數定義
         self.param_map = {p["name"]: p for p in self.parameters}
 
+        # 可選的幀序號計數器 (is_sequence_counter: true)，用於偵測掉幀
+        self.sequence_counter = next((p for p in self.parameters if p.get("is_sequence_counter")), None)
+
     def get_parameter_definition(self, name):
         return self.param_map.get(name)
 
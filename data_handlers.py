@@ -4,6 +4,8 @@ import datetime
 import asyncio 
 import websockets 
 
+from arrow_export import ArrowFlightLogWriter, DEFAULT_BATCH_ROWS
+
 class AbstractDataHandler(abc.ABC):
     @abc.abstractmethod
     def setup(self):
@@ -54,6 +56,38 @@ class FileLogHandler(AbstractDataHandler):
         if self.file:
             self.file.close()
             print(f"[FileLogHandler] 清理完成，日誌檔案 {self.filepath} 已關閉。")
+
+class ArrowBatchHandler(AbstractDataHandler):
+    """
+    以欄式格式串流寫入 Parquet / Arrow IPC (需要可選的 pyarrow 套件)。
+    數據累積到 batch_rows 列時寫出一個 row group；檔案在 cleanup() 寫入 footer 後才可讀取。
+    """
+    def __init__(self, config, filepath="flight_data.parquet", file_format=None,
+                 batch_rows=DEFAULT_BATCH_ROWS, include_raw_frames=False):
+        self.config = config
+        self.filepath = filepath
+        self.file_format = file_format
+        self.batch_rows = batch_rows
+        self.include_raw_frames = include_raw_frames
+        self.writer = None
+    def setup(self):
+        # pyarrow 未安裝時拋出 ImportError，由主程式決定是否停用此 Handler
+        self.writer = ArrowFlightLogWriter(
+            self.config, self.filepath, file_format=self.file_format,
+            batch_rows=self.batch_rows, include_raw_frames=self.include_raw_frames,
+        )
+        print(f"[ArrowBatchHandler] 初始化完成，欄式數據將寫入至 {self.filepath} ({self.writer.file_format})")
+    def handle_data(self, decoded_data_with_timestamp):
+        if self.writer is not None:
+            try:
+                self.writer.append(decoded_data_with_timestamp) # 批次滿時自動寫出
+            except Exception as e:
+                print(f"[ArrowBatchHandler] 寫入數據時發生錯誤: {e}")
+    def cleanup(self):
+        if self.writer is not None:
+            self.writer.close()
+            print(f"[ArrowBatchHandler] 清理完成，共寫入 {self.writer.rows_written} 列至 {self.filepath}。")
+            self.writer = None
 # --- WebSocketDataHandler 實現 ---
 class WebSocketDataHandler(AbstractDataHandler):
     def __init__(self, host="localhost", port=8765):
@@ -63,9 +97,11 @@ class WebSocketDataHandler(AbstractDataHandler):
         self._server = None # 用於保存 websockets.serve 的返回物件
         self._server_task = None # 用於保存 WebSocket 伺服器的 asyncio Task
         self._broadcast_queue = asyncio.Queue(maxsize=100) # 異步佇列，限制大小以防記憶體無限增長
+        self.dropped_message_count = 0 # 因佇列已滿而被本地管線丟棄的訊息數 (與射頻鏈路掉幀區分)
 
-    async def _register_client(self, websocket, path):
-        """當新的 WebSocket 客戶端連接時被調用"""
+    async def _register_client(self, websocket, path=None):
+        """當新的 WebSocket 客戶端連接時被調用
+        (websockets 14 以前的 handler 會多收到 path 參數，14 之後只傳入連線物件，兩者皆支援)"""
         self.connected_clients.add(websocket)
         print(f"[WebSocket] 用戶端 {websocket.remote_address} 已連接。目前 {len(self.connected_clients)} 個連接。")
         try:
@@ -92,14 +128,13 @@ class WebSocketDataHandler(AbstractDataHandler):
                     break
 
                 if self.connected_clients:
-                    websockets.broadcast(self.connected_clients, message_to_send) # 較新版本
-                    # 為了兼容性和更細緻的錯誤處理，手動迭代：
-                    tasks = [client.send(message_to_send) for client in list(self.connected_clients)]
+                    # 為了兼容性和更細緻的錯誤處理，手動迭代 (每則訊息只送一次，不再另外呼叫 websockets.broadcast)：
+                    clients = list(self.connected_clients)
+                    tasks = [client.send(message_to_send) for client in clients]
                     results = await asyncio.gather(*tasks, return_exceptions=True)
-                    for i, result in enumerate(results):
+                    for client, result in zip(clients, results):
                         if isinstance(result, Exception):
-                            client_addr = list(self.connected_clients)[i].remote_address # 獲取地址可能複雜
-                            print(f"[WebSocket] 發送數據給某個客戶端時發生錯誤: {result}")
+                            print(f"[WebSocket] 發送數據給客戶端 {client.remote_address} 時發生錯誤: {result}")
                             # 此處可以考慮移除發送失敗的客戶端
             except asyncio.CancelledError:
                 print("[WebSocket] 廣播迴圈被取消。")
@@ -155,6 +190,7 @@ class WebSocketDataHandler(AbstractDataHandler):
         try:
             self._broadcast_queue.put_nowait(message)
         except asyncio.QueueFull:
+            self.dropped_message_count += 1
             print(f"[WebSocket] 警告: 數據廣播佇列已滿 ({self._broadcast_queue.qsize()})，最新數據可能被丟棄。")
         except Exception as e:
             print(f"[WebSocket] 推送數據到佇列時發生錯誤: {e}")
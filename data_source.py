@@ -10,9 +10,24 @@ class AbstractDataSource(abc.ABC):
         pass
 
 class SimulatedDataSource(AbstractDataSource):
-    def __init__(self, config):
+    def __init__(self, config, link_loss_rate=0.0):
+        if not 0.0 <= link_loss_rate < 1.0:
+            raise ValueError(f"link_loss_rate 必須介於 0.0 (含) 與 1.0 (不含) 之間，收到: {link_loss_rate}")
         self.config = config
         self.rng = random.Random()
+        # 模擬射頻鏈路掉幀的機率 (0.0 表示不掉幀)，被丟棄的幀仍會消耗一個序號
+        self.link_loss_rate = link_loss_rate
+        self._sequence = 0
+
+    def _next_sequence(self):
+        """取得下一個幀序號，依計數器欄位寬度自動回捲 (wraparound)"""
+        counter_def = self.config.sequence_counter
+        modulus = 1 << (8 * counter_def["length"])
+        while True:
+            sequence = self._sequence
+            self._sequence = (self._sequence + 1) % modulus
+            if self.rng.random() >= self.link_loss_rate:
+                return sequence
 
     def get_next_frame(self):
         """產生一個模擬的二進制數據幀"""
@@ -34,6 +49,8 @@ class SimulatedDataSource(AbstractDataSource):
             "status_byte": self.rng.randint(0, 7),
             "checksum": 0xEE # 虛擬校驗和
         }
+        if self.config.sequence_counter:
+            sim_values[self.config.sequence_counter["name"]] = self._next_sequence()
         
         # 按照設定檔中參數的順序和格式進行打包
         # 注意: 為了簡化，我們假設設定檔中的參數順序就是打包順序
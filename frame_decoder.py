@@ -43,11 +43,11 @@ class TelemetryFrameDecoder:
                 # 解包
                 raw_value, = struct.unpack(self.config.byte_order + fmt, param_bytes)
                 
-                # 應用縮放因子 (如果不是同步字或校驗和等特殊字段)
-                if not param_def.get("is_sync") and not param_def.get("is_checksum"):
+                # 應用縮放因子 (如果不是同步字、校驗和或序號計數器等特殊字段)
+                if not param_def.get("is_sync") and not param_def.get("is_checksum") and not param_def.get("is_sequence_counter"):
                     engineered_value = raw_value * scale
                 else:
-                    engineered_value = raw_value # 對於同步字或校驗和，通常不縮放
+                    engineered_value = raw_value # 對於同步字、校驗和或序號，不縮放
 
                 decoded_data[name] = engineered_value
                 if unit: # 如果有單位，也加入
@@ -8,6 +8,7 @@ try:
     from config_loader import TelemetryConfig
     from data_source import SimulatedDataSource # 可替換
     from frame_decoder import TelemetryFrameDecoder
+    from sequence_tracker import SequenceTracker
     from data_handlers import ConsoleLogHandler, FileLogHandler, WebSocketDataHandler # 引入修改後的 WebSocketDataHandler
 except ImportError as e:
     print(f"錯誤：無法導入必要的模組 - {e}")
@@ -21,9 +22,10 @@ def handle_signal(sig, frame):
     print(f"\n收到信號 {sig}。正在準備優雅關閉...")
     shutdown_event.set()
 
-async def data_processing_simulation_loop(config, data_source, decoder, handlers, max_frames, loop):
+async def data_processing_simulation_loop(config, data_source, decoder, handlers, max_frames, loop, sequence_tracker=None, frame_interval_s=0.2):
     """
     模擬數據的產生、解碼和分發給 Handlers 的異步迴圈。
+    frame_interval_s 為數據幀之間的間隔；設為 0 時以最高速率運行 (例如基準測試)。
     """
     frame_count = 0
     error_count = 0
@@ -48,6 +50,13 @@ async def data_processing_simulation_loop(config, data_source, decoder, handlers
         if decoded_data:
             frame_count += 1
             error_count = 0
+            link_quality = None
+            if sequence_tracker is not None and sequence_tracker.update(decoded_data) is not None:
+                # 鏈路品質統計作為合成參數流，與遙測數據一起發佈到儀表板
+                link_quality = sequence_tracker.get_link_statistics()
+                link_quality["pipeline_dropped_frames"] = sum(
+                    getattr(handler, "dropped_message_count", 0) for handler in handlers
+                )
             processing_timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             data_to_handle = {
                 "processing_timestamp_utc": processing_timestamp,
@@ -56,6 +65,8 @@ async def data_processing_simulation_loop(config, data_source, decoder, handlers
                 "raw_frame_hex": raw_frame.hex().upper(), # 可以選擇是否包含原始幀
                 "decoded_payload": decoded_data
             }
+            if link_quality is not None:
+                data_to_handle["link_quality"] = link_quality
 
             # 3. 分發給 Handlers
             for handler in handlers:
@@ -75,7 +86,7 @@ async def data_processing_simulation_loop(config, data_source, decoder, handlers
         else:
             print("[DataLoop] 數據幀解碼失敗或無效。")
         
-        await asyncio.sleep(0.2) # 模擬數據幀之間的處理間隔
+        await asyncio.sleep(frame_interval_s) # 模擬數據幀之間的處理間隔
 
     print(f"[DataLoop] 已處理 {frame_count} 個數據幀。數據處理迴圈結束。")
     shutdown_event.set() # 通知其他任務也準備關閉
@@ -104,6 +115,7 @@ async def main_async():
 
     data_source = SimulatedDataSource(config)
     decoder = TelemetryFrameDecoder(config)
+    sequence_tracker = SequenceTracker(config) # 偵測序號斷層 (射頻鏈路掉幀)
 
     # 初始化 Handlers
     console_handler = ConsoleLogHandler()
@@ -133,7 +145,7 @@ async def main_async():
         # 啟動數據處理迴圈
         max_frames = 10000 # 運行更多幀，或直到被中斷
         data_loop_task = asyncio.create_task(
-            data_processing_simulation_loop(config, data_source, decoder, all_handlers, max_frames, loop)
+            data_processing_simulation_loop(config, data_source, decoder, all_handlers, max_frames, loop, sequence_tracker)
         )
         server_tasks.append(data_loop_task)
         if hasattr(websocket_handler, '_server') and websocket_handler._server is not None:
@@ -6,8 +6,10 @@ try:
     from config_loader import TelemetryConfig
     from data_source import SimulatedDataSource # 您可以根據需要替換成其他數據源
     from frame_decoder import TelemetryFrameDecoder
+    from sequence_tracker import SequenceTracker
     from data_handlers import ConsoleLogHandler, FileLogHandler # 您可以加入更多 Handler
     from data_handlers import WebSocketDataHandler # 並確保 data_handlers.py 中有其定義
+    from data_handlers import ArrowBatchHandler # 欄式匯出，需要可選的 pyarrow 套件
     
 except ImportError as e:
     print(f"錯誤：無法導入必要的模組 - {e}")
@@ -47,6 +49,7 @@ def main():
     try:
         data_source = SimulatedDataSource(config) # 使用模擬數據源
         decoder = TelemetryFrameDecoder(config)
+        sequence_tracker = SequenceTracker(config) # 偵測序號斷層 (射頻鏈路掉幀)
     except Exception as e:
         print(f"初始化數據源或解碼器時發生錯誤: {e}")
         sys.exit(1)
@@ -54,10 +57,12 @@ def main():
     # 註冊數據處理器 (可以根據需求增減)
     handlers = [
         ConsoleLogHandler(),
-        FileLogHandler(filepath="flight_data_log.jsonl") # 記錄到 JSON Lines 檔案
+        FileLogHandler(filepath="flight_data_log.jsonl"), # 記錄到 JSON Lines 檔案
         # --- 若要啟用WebSocket Handler (注意：這需要主循環改為異步或在獨立線程運行WebSocket伺服器) ---
-        WebSocketDataHandler(host="localhost", port=8765) 
+        # WebSocketDataHandler(host="localhost", port=8765),
         # ------------------------------------------------------------------------------------
+        # --- 若已安裝 pyarrow，可加入欄式 Parquet 匯出 (供離線分析) ---
+        # ArrowBatchHandler(config, filepath="flight_data.parquet")
     ]
 
     # 設定所有 handlers
@@ -107,6 +112,13 @@ def main():
             if decoded_data:
                 frame_count += 1
                 error_count = 0 # 成功處理，重置錯誤計數
+                link_quality = None
+                if sequence_tracker.update(decoded_data) is not None:
+                    # 鏈路品質統計作為合成參數流發佈；本地管線丟棄的訊息另行計數
+                    link_quality = sequence_tracker.get_link_statistics()
+                    link_quality["pipeline_dropped_frames"] = sum(
+                        getattr(handler, "dropped_message_count", 0) for handler in active_handlers
+                    )
                 # 為數據加上處理時間戳 (使用UTC時間並格式化為ISO 8601)
                 processing_timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
                 
@@ -118,6 +130,8 @@ def main():
                     "raw_frame_hex": raw_frame.hex().upper(), # 加入原始幀的十六進制表示
                     "decoded_payload": decoded_data
                 }
+                if link_quality is not None:
+                    data_to_handle["link_quality"] = link_quality
                 
                 # c. 將解碼後的數據傳遞給所有註冊的處理器
                 for handler in active_handlers:
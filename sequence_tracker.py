@@ -0,0 +1,261 @@
+import collections
+import time
+
+class SequenceTracker:
+    """
+    位於 TelemetryFrameDecoder 之後，根據設定檔中的序號計數器 (is_sequence_counter)
+    偵測掉幀、重複幀、回捲 (wraparound)、亂序幀與計數器重置，並維護滾動的鏈路品質統計。
+    每一幀的處理皆為 O(1)。
+
+    與 RFC 3550 / DTLS 的重播視窗相同，以固定大小的位元圖記錄最近 WINDOW_SIZE 個序號
+    是否已收到：視窗內已收到的舊序號為重複幀，未收到的 (先前已計為遺失) 為遲到幀並回補統計；
+    以下情況視為計數器重置 (例如箭載電腦重新啟動)，並以該序號重新同步：
+      - 序號落後超過視窗；
+      - 序號前跳的幅度無法以經過的時間解釋 (依平均到達間隔估算可能送出的幀數)；
+      - 視窗內連續 RESET_CONFIRM_FRAMES 個依序遞增的「重複」舊序號 (重置後很快又回到視窗內)。
+    """
+
+    # 指數移動平均的平滑係數 (與 RFC 3550 的 1/16 抖動估計相同)
+    EWMA_ALPHA = 1.0 / 16.0
+    # 重播視窗大小 (位元數)
+    WINDOW_SIZE = 64
+    # 判斷前跳是否合理時，對經過時間所能解釋幀數的容許倍數
+    RESET_SLACK = 2.0
+    # 視窗內依序遞增的舊序號達此數量時，判定為計數器重置而非重複幀
+    RESET_CONFIRM_FRAMES = 2
+
+    def __init__(self, config, clock=time.monotonic):
+        self.config = config
+        self.clock = clock
+        self.counter_def = config.sequence_counter
+        if self.counter_def:
+            self.counter_name = self.counter_def["name"]
+            self.modulus = 1 << (8 * self.counter_def["length"])
+        else:
+            self.counter_name = None
+            self.modulus = 0
+        self.reset()
+
+    def reset(self):
+        """清除所有狀態與統計"""
+        self.last_sequence = None
+        self.last_arrival = None
+        self.received_count = 0
+        self.lost_count = 0
+        self.duplicate_count = 0
+        self.out_of_order_count = 0
+        self.wraparound_count = 0
+        self.counter_reset_count = 0
+        self.burst_count = 0
+        self.current_burst_length = 0
+        self.max_burst_length = 0
+        self.total_burst_frames = 0
+        self.rolling_loss_rate = 0.0
+        self.mean_interval_s = None
+        self.jitter_s = 0.0
+        # 視窗位元 i 代表序號 last_sequence - i 是否已收到
+        self._window = 0
+        # 不回捲的擴展序號，用於定位視窗內的突發 (burst)
+        self._extended_sequence = 0
+        self._sync_start = 0
+        # 視窗內依序遞增的重複舊序號: (最新序號, 連續數量)，用於偵測重置
+        self._duplicate_run = None
+        # 仍與視窗重疊的突發: [起始擴展序號, 長度]
+        self._recent_bursts = collections.deque()
+        # 各突發長度的出現次數，用於在突發被拆分後維護最大突發長度
+        self._burst_lengths = collections.Counter()
+
+    def update(self, decoded_data):
+        """
+        處理一個已解碼的數據幀，返回該幀的分類：
+        "first", "in_order", "gap", "duplicate", "out_of_order", "reset"；
+        若設定檔未定義序號計數器或該幀缺少序號，返回 None。
+        """
+        if not self.counter_name:
+            return None
+        sequence = decoded_data.get(self.counter_name)
+        if not isinstance(sequence, int):
+            return None
+
+        now = self.clock()
+
+        if self.last_sequence is None:
+            self._resync(sequence, now)
+            return "first"
+
+        # 以模運算計算與預期序號的前向距離，自然處理回捲
+        delta = (sequence - self.last_sequence) % self.modulus
+        if 0 < delta <= self.modulus // 2:
+            if not self._forward_jump_plausible(delta, now):
+                return self._counter_reset(sequence, now)
+            self._duplicate_run = None
+            return self._advance(sequence, delta, now)
+
+        # 序號等於或落後於已接收的最新序號
+        offset = (self.last_sequence - sequence) % self.modulus
+        if offset >= self.WINDOW_SIZE:
+            return self._counter_reset(sequence, now)
+        if self._window >> offset & 1:
+            return self._old_duplicate(sequence, offset, now)
+        self._duplicate_run = None
+        self.out_of_order_count += 1
+        self.received_count += 1
+        if offset < self._extended_sequence - self._sync_start + 1:
+            # 同步之後才被計為遺失的幀，現在遲到抵達：回補統計
+            self._recover_late(offset)
+        return "out_of_order"
+
+    def _forward_jump_plausible(self, delta, now):
+        """前跳 delta 是否能以距上一幀經過的時間解釋 (尚無平均間隔時一律接受)"""
+        if delta <= self.WINDOW_SIZE or not self.mean_interval_s:
+            return True
+        elapsed_frames = (now - self.last_arrival) / self.mean_interval_s
+        return delta <= elapsed_frames * self.RESET_SLACK + self.WINDOW_SIZE
+
+    def _old_duplicate(self, sequence, offset, now):
+        """視窗內已收到的序號：通常為重複幀，但依序遞增的一串則是重置後的新幀"""
+        run = self._duplicate_run
+        if offset and run is not None and sequence == (run[0] + 1) % self.modulus:
+            run = (sequence, run[1] + 1)
+        elif offset:
+            run = (sequence, 1)
+        else:
+            run = None
+        self._duplicate_run = run
+        if run is not None and run[1] >= self.RESET_CONFIRM_FRAMES:
+            # 先前被計為重複的幀其實是重置後的新幀，改計為已接收
+            self.duplicate_count -= run[1] - 1
+            self.received_count += run[1] - 1
+            return self._counter_reset(sequence, now)
+        self.duplicate_count += 1
+        return "duplicate"
+
+    def _counter_reset(self, sequence, now):
+        self.counter_reset_count += 1
+        self._duplicate_run = None
+        self._resync(sequence, now)
+        return "reset"
+
+    def _resync(self, sequence, now):
+        """以 sequence 重新同步 (首幀或計數器重置)，累計統計保留不變"""
+        self._extended_sequence += self.WINDOW_SIZE # 與舊視窗不重疊
+        self._sync_start = self._extended_sequence
+        self._window = 1
+        self._recent_bursts.clear()
+        self.current_burst_length = 0
+        self.last_sequence = sequence
+        self.last_arrival = now
+        self.received_count += 1
+
+    def _advance(self, sequence, delta, now):
+        missing = delta - 1
+        if sequence < self.last_sequence:
+            self.wraparound_count += 1
+
+        self._update_loss(missing)
+        self._update_jitter(now, delta)
+
+        self._extended_sequence += delta
+        if delta >= self.WINDOW_SIZE:
+            self._window = 1
+        else:
+            self._window = ((self._window << delta) | 1) & ((1 << self.WINDOW_SIZE) - 1)
+        # 移除已完全移出視窗的突發 (視窗內最多 WINDOW_SIZE / 2 個，因此仍為 O(1))
+        oldest = self._extended_sequence - self.WINDOW_SIZE
+        while self._recent_bursts and sum(self._recent_bursts[0]) - 1 <= oldest:
+            self._recent_bursts.popleft()
+
+        self.last_sequence = sequence
+        self.last_arrival = now
+        self.received_count += 1
+        return "gap" if missing else "in_order"
+
+    def _add_burst(self, length):
+        self.burst_count += 1
+        self.total_burst_frames += length
+        self._burst_lengths[length] += 1
+        self.max_burst_length = max(self.max_burst_length, length)
+
+    def _remove_burst(self, length):
+        self.burst_count -= 1
+        self.total_burst_frames -= length
+        self._burst_lengths[length] -= 1
+        if not self._burst_lengths[length]:
+            del self._burst_lengths[length]
+            if length == self.max_burst_length:
+                self.max_burst_length = max(self._burst_lengths, default=0)
+
+    def _update_loss(self, missing):
+        """更新遺失計數、突發 (burst) 長度與滾動遺失率"""
+        keep = 1.0 - self.EWMA_ALPHA
+        if missing:
+            self.lost_count += missing
+            self._add_burst(missing)
+            self._recent_bursts.append([self._extended_sequence + 1, missing])
+            self.current_burst_length = missing
+            # 等效於對 missing 個遺失樣本 (值 1) 逐一做 EWMA，但以封閉形式 O(1) 計算
+            decay = keep ** missing
+            self.rolling_loss_rate = self.rolling_loss_rate * decay + (1.0 - decay)
+        else:
+            self.current_burst_length = 0
+        # 本次成功接收的樣本 (值 0)
+        self.rolling_loss_rate *= keep
+
+    def _recover_late(self, offset):
+        """遲到幀：撤銷其遺失計數、在滾動遺失率中的貢獻，並拆分所屬的突發"""
+        self._window |= 1 << offset
+        self.lost_count -= 1
+        # 每個序號位置在 EWMA 中為一個樣本，距今 offset 個樣本的權重為 alpha * keep^offset
+        keep = 1.0 - self.EWMA_ALPHA
+        self.rolling_loss_rate = max(0.0, self.rolling_loss_rate - self.EWMA_ALPHA * keep ** offset)
+
+        late = self._extended_sequence - offset
+        for index, (start, length) in enumerate(self._recent_bursts):
+            if start <= late < start + length:
+                break
+        else:
+            return
+        del self._recent_bursts[index]
+        self._remove_burst(length)
+        before, after = late - start, start + length - 1 - late
+        if after:
+            self._recent_bursts.insert(index, [late + 1, after])
+            self._add_burst(after)
+        if before:
+            self._recent_bursts.insert(index, [start, before])
+            self._add_burst(before)
+        if self.current_burst_length and start + length == self._extended_sequence:
+            # 所屬突發緊接在最新一幀之前
+            self.current_burst_length = after
+
+    def _update_jitter(self, now, delta):
+        """以每幀平均到達間隔估計到達間隔抖動 (類似 RFC 3550)"""
+        interval = (now - self.last_arrival) / delta
+        if self.mean_interval_s is None:
+            self.mean_interval_s = interval
+            return
+        deviation = abs(interval - self.mean_interval_s)
+        self.mean_interval_s += (interval - self.mean_interval_s) * self.EWMA_ALPHA
+        self.jitter_s += (deviation - self.jitter_s) * self.EWMA_ALPHA
+
+    def get_link_statistics(self):
+        """返回目前的鏈路品質統計 (可直接序列化為 JSON)"""
+        expected = self.received_count + self.lost_count
+        return {
+            "enabled": self.counter_name is not None,
+            "last_sequence": self.last_sequence,
+            "received_frames": self.received_count,
+            "lost_frames": self.lost_count,
+            "duplicate_frames": self.duplicate_count,
+            "out_of_order_frames": self.out_of_order_count,
+            "wraparounds": self.wraparound_count,
+            "counter_resets": self.counter_reset_count,
+            "loss_rate": self.lost_count / expected if expected else 0.0,
+            "rolling_loss_rate": self.rolling_loss_rate,
+            "burst_count": self.burst_count,
+            "current_burst_length": self.current_burst_length,
+            "max_burst_length": self.max_burst_length,
+            "mean_burst_length": self.total_burst_frames / self.burst_count if self.burst_count else 0.0,
+            "mean_interval_s": self.mean_interval_s,
+            "jitter_s": self.jitter_s,
+        }
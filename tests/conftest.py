@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 專案模組位於根目錄 (非套件)，測試時加入匯入路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,100 @@
+import datetime
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("websockets") # data_handlers 匯入時需要
+
+from config_loader import TelemetryConfig
+from data_handlers import ArrowBatchHandler
+from data_source import SimulatedDataSource
+from frame_decoder import TelemetryFrameDecoder
+from arrow_export import load_flight_table
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "telemetry parameters.json")
+
+
+def make_records(config, count):
+    data_source = SimulatedDataSource(config)
+    decoder = TelemetryFrameDecoder(config)
+    records = []
+    for _ in range(count):
+        raw_frame = data_source.get_next_frame()
+        decoded_data = decoder.decode(raw_frame)
+        records.append({
+            "processing_timestamp_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "source_timestamp_s": decoded_data.get("timestamp_s", "N/A"),
+            "rocket_id": decoded_data.get("rocket_id", "N/A"),
+            "raw_frame_hex": raw_frame.hex().upper(),
+            "decoded_payload": decoded_data,
+        })
+    return records
+
+
+@pytest.mark.parametrize("filename", ["flight.parquet", "flight.arrow"])
+def test_arrow_batch_handler_round_trip(tmp_path, filename):
+    config = TelemetryConfig(config_path=CONFIG_PATH)
+    records = make_records(config, 50)
+    filepath = str(tmp_path / filename)
+
+    handler = ArrowBatchHandler(config, filepath=filepath, batch_rows=16)
+    handler.setup()
+    for record in records:
+        handler.handle_data(record)
+    handler.cleanup()
+
+    table = load_flight_table(filepath)
+    assert table.num_rows == 50
+    assert table.column("frame_counter").to_pylist() == list(range(50))
+    assert table.column("altitude").to_pylist() == [r["decoded_payload"]["altitude"] for r in records]
+    assert set(table.column("altitude_unit").to_pylist()) == {"m"}
+    assert table.column("status_byte").to_pylist() == [r["decoded_payload"]["status_byte"] for r in records]
+
+
+def test_schema_keeps_integer_types_for_unscaled_parameters(tmp_path):
+    import pyarrow as pa
+    from arrow_export import ArrowFlightLogWriter
+
+    config = TelemetryConfig(config_path=CONFIG_PATH)
+    schema = ArrowFlightLogWriter(config, str(tmp_path / "flight.parquet")).schema
+    assert schema.field("status_byte").type == pa.uint8()
+    assert schema.field("rocket_id").type == pa.uint8()
+    assert schema.field("timestamp_s").type == pa.uint32()
+    assert schema.field("frame_counter").type == pa.uint16()
+    assert schema.field("altitude").type == pa.float64()
+
+
+def test_writer_close_is_idempotent_and_rejects_appends(tmp_path):
+    from arrow_export import ArrowFlightLogWriter
+
+    config = TelemetryConfig(config_path=CONFIG_PATH)
+    records = make_records(config, 10)
+    filepath = str(tmp_path / "flight.arrow")
+
+    writer = ArrowFlightLogWriter(config, filepath)
+    for record in records:
+        writer.append(record)
+    writer.close()
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.append(records[0])
+
+    assert load_flight_table(filepath).num_rows == 10
+
+
+def test_convert_jsonl_log_skips_invalid_lines(tmp_path):
+    import json
+    from arrow_export import convert_jsonl_log
+
+    config = TelemetryConfig(config_path=CONFIG_PATH)
+    records = make_records(config, 5)
+    input_path = tmp_path / "flight_data_log.jsonl"
+    lines = [json.dumps(record) for record in records]
+    lines[1:1] = ["{not json", "[1, 2]", "42"]
+    input_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    output_path = str(tmp_path / "flight.parquet")
+    rows, skipped = convert_jsonl_log(config, str(input_path), output_path)
+    assert (rows, skipped) == (5, 3)
+    assert load_flight_table(output_path).column("frame_counter").to_pylist() == list(range(5))
@@ -0,0 +1,150 @@
+import itertools
+import types
+
+import pytest
+
+from sequence_tracker import SequenceTracker
+
+
+def make_tracker(length=2):
+    config = types.SimpleNamespace(sequence_counter={"name": "frame_counter", "length": length})
+    clock = itertools.count(0.0, 0.2)
+    return SequenceTracker(config, clock=lambda: next(clock))
+
+
+def feed(tracker, sequences):
+    return [tracker.update({"frame_counter": s}) for s in sequences]
+
+
+def test_in_order_frames_have_no_loss():
+    tracker = make_tracker()
+    assert feed(tracker, [0, 1, 2, 3]) == ["first", "in_order", "in_order", "in_order"]
+    stats = tracker.get_link_statistics()
+    assert stats["received_frames"] == 4
+    assert stats["lost_frames"] == 0
+    assert stats["rolling_loss_rate"] == 0.0
+
+
+def test_gap_counts_lost_frames_as_one_burst():
+    tracker = make_tracker()
+    assert feed(tracker, [0, 1, 4]) == ["first", "in_order", "gap"]
+    stats = tracker.get_link_statistics()
+    assert stats["lost_frames"] == 2
+    assert stats["burst_count"] == 1
+    assert stats["max_burst_length"] == 2
+    assert stats["current_burst_length"] == 2
+    assert stats["loss_rate"] == pytest.approx(2 / 5)
+
+
+def test_duplicate_of_latest_frame():
+    tracker = make_tracker()
+    assert feed(tracker, [0, 1, 1]) == ["first", "in_order", "duplicate"]
+    stats = tracker.get_link_statistics()
+    assert stats["duplicate_frames"] == 1
+    assert stats["received_frames"] == 2
+    assert stats["lost_frames"] == 0
+
+
+def test_late_frame_is_credited_and_late_duplicate_is_detected():
+    tracker = make_tracker()
+    assert feed(tracker, [0, 1, 2, 5, 3, 3]) == ["first", "in_order", "in_order", "gap", "out_of_order", "duplicate"]
+    stats = tracker.get_link_statistics()
+    # 幀 4 從未抵達
+    assert stats["lost_frames"] == 1
+    assert stats["out_of_order_frames"] == 1
+    assert stats["duplicate_frames"] == 1
+    assert stats["received_frames"] == 5
+    assert stats["burst_count"] == 1
+    assert stats["max_burst_length"] == 1
+    assert stats["current_burst_length"] == 1
+
+    # 統計應與「幀 3 準時抵達、只遺失幀 4」完全一致
+    reference = make_tracker()
+    feed(reference, [0, 1, 2, 3, 5])
+    expected = reference.get_link_statistics()
+    for key in ("lost_frames", "burst_count", "max_burst_length", "mean_burst_length", "current_burst_length"):
+        assert stats[key] == expected[key]
+    assert stats["rolling_loss_rate"] == pytest.approx(expected["rolling_loss_rate"])
+
+
+def test_late_frame_splits_burst():
+    tracker = make_tracker()
+    feed(tracker, [0, 6, 3])
+    stats = tracker.get_link_statistics()
+    assert stats["lost_frames"] == 4
+    assert stats["burst_count"] == 2
+    assert stats["max_burst_length"] == 2
+    assert stats["mean_burst_length"] == 2.0
+    assert stats["current_burst_length"] == 2
+
+
+def test_late_frame_from_before_first_frame_is_not_credited():
+    tracker = make_tracker()
+    assert feed(tracker, [5, 6, 3]) == ["first", "in_order", "out_of_order"]
+    assert tracker.get_link_statistics()["lost_frames"] == 0
+
+
+def test_wraparound():
+    tracker = make_tracker()
+    assert feed(tracker, [65534, 65535, 0, 1]) == ["first", "in_order", "in_order", "in_order"]
+    stats = tracker.get_link_statistics()
+    assert stats["wraparounds"] == 1
+    assert stats["lost_frames"] == 0
+
+
+def test_wraparound_with_gap_and_late_frame():
+    tracker = make_tracker(length=1)
+    assert feed(tracker, [254, 1, 255]) == ["first", "gap", "out_of_order"]
+    stats = tracker.get_link_statistics()
+    assert stats["wraparounds"] == 1
+    assert stats["lost_frames"] == 1
+    assert stats["max_burst_length"] == 1
+
+
+def test_counter_reset_resynchronizes():
+    tracker = make_tracker()
+    feed(tracker, range(500, 510))
+    assert feed(tracker, [0, 1, 2]) == ["reset", "in_order", "in_order"]
+    stats = tracker.get_link_statistics()
+    assert stats["counter_resets"] == 1
+    assert stats["lost_frames"] == 0
+    assert stats["last_sequence"] == 2
+    assert stats["received_frames"] == 13
+
+
+def test_counter_reset_from_upper_half_is_not_a_gap():
+    tracker = make_tracker()
+    assert feed(tracker, [40000, 40001, 0, 1]) == ["first", "in_order", "reset", "in_order"]
+    stats = tracker.get_link_statistics()
+    assert stats["counter_resets"] == 1
+    assert stats["lost_frames"] == 0
+    assert stats["wraparounds"] == 0
+    assert stats["loss_rate"] == 0.0
+
+
+def test_counter_reset_within_window():
+    tracker = make_tracker()
+    feed(tracker, range(30))
+    assert feed(tracker, [0, 1, 2]) == ["duplicate", "reset", "in_order"]
+    stats = tracker.get_link_statistics()
+    assert stats["counter_resets"] == 1
+    assert stats["duplicate_frames"] == 0
+    assert stats["received_frames"] == 33
+    assert stats["lost_frames"] == 0
+
+
+def test_long_outage_is_a_gap_not_a_reset():
+    times = iter([0.0, 0.2, 0.4, 60.4])
+    config = types.SimpleNamespace(sequence_counter={"name": "frame_counter", "length": 2})
+    tracker = SequenceTracker(config, clock=lambda: next(times))
+    # 斷線 60 秒 (約 300 幀) 後恢復
+    assert feed(tracker, [0, 1, 2, 302]) == ["first", "in_order", "in_order", "gap"]
+    stats = tracker.get_link_statistics()
+    assert stats["counter_resets"] == 0
+    assert stats["lost_frames"] == 299
+
+
+def test_no_sequence_counter_configured():
+    tracker = SequenceTracker(types.SimpleNamespace(sequence_counter=None))
+    assert tracker.update({"frame_counter": 1}) is None
+    assert tracker.get_link_statistics()["enabled"] is False